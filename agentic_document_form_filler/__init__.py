@@ -4,5 +4,7 @@ from agentic_document_form_filler.lib.config import default_config as config
 
 __version__ = "1.0.0"
 
-logging.basicConfig(level=config.log_level)
+# library-style logging: stay silent unless the application
+# configures handlers (main.fill does so for CLI use)
 logger = logging.getLogger(config.name)
+logger.addHandler(logging.NullHandler())
@@ -6,3 +6,4 @@ class QueryEvent(Event):
 
     query: str
     field: str
+    has_feedback: bool = False
@@ -5,6 +5,17 @@ from pydantic import BaseModel
 
 logger = logging.getLogger("agenticDocumentFiller.config")
 
+# maps config fields to the environment variables that override them
+_ENV_MAP = {
+    "groq_api_key": "GROQ_API_KEY",
+    "llama_index_api_key": "LLAMA_INDEX_API_KEY",
+    "storage_dir": "STORAGE_DIR",
+    "groq_model": "GROQ_MODEL",
+    "embedding_model": "EMBEDDING_MODEL",
+    "max_concurrency": "MAX_CONCURRENCY",
+    "query_cache_threshold": "QUERY_CACHE_THRESHOLD",
+}
+
 
 class Config(BaseModel):
     """
@@ -18,22 +29,20 @@ class Config(BaseModel):
     storage_dir: str = "./storage"
     groq_model: str = "llama-3.1-8b-instant"
     embedding_model: str = "BAAI/bge-small-en-v1.5"
+    max_concurrency: int = 5
+    query_cache_threshold: float = 0.95
 
     @classmethod
     def factory(cls) -> "Config":
         """Configuration reader."""
-        # overwrite configs by environment variables
-        config = cls()
-        config.groq_api_key = os.getenv("GROQ_API_KEY", config.groq_api_key)
-        config.llama_index_api_key = os.getenv(
-            "LLAMA_INDEX_API_KEY", config.llama_index_api_key
-        )
-        config.storage_dir = os.getenv("STORAGE_DIR", config.storage_dir)
-        config.groq_model = os.getenv("GROQ_MODEL", config.groq_model)
-        config.embedding_model = os.getenv("EMBEDDING_MODEL",
-                                           config.embedding_model)
-
-        return config
+        # collect environment overrides in one pass and let pydantic
+        # validate (and coerce) the fully-populated model once
+        overrides = {
+            field: value
+            for field, env in _ENV_MAP.items()
+            if (value := os.getenv(env)) is not None
+        }
+        return cls(**overrides)
 
 
 default_config: Config = Config.factory()
@@ -0,0 +1,120 @@
+import os
+import pickle
+import time
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """
+    A small semantic cache for question/answer pairs.
+    Questions are stored as L2-normalized embeddings; a lookup
+    embeds the incoming question and returns the cached answer of
+    the nearest stored question when its cosine similarity clears
+    the threshold, bypassing both vector search and the LLM.
+    Entries expire after a TTL and the least recently used entry is
+    evicted when the cache is full. The cache is persisted with
+    pickle so hits carry over between runs; the persisted state
+    records the embedding model name and is discarded if it was
+    written by a different model.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        threshold: float = 0.95,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+    ) -> None:
+        self.path = path
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._embeddings = np.empty((0, 0), dtype=np.float32)
+        self._answers: list[str] = []
+        self._last_used: list[float] = []
+        self._expires: list[float] = []
+        self._load()
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state["model"] != self.model_name:
+                # vectors from a different embedding model (and
+                # possibly dimension) are useless here
+                return
+            self._embeddings = state["embeddings"]
+            self._answers = state["answers"]
+            self._last_used = state["last_used"]
+            self._expires = state["expires"]
+        except (OSError, pickle.PickleError, KeyError):
+            # a corrupt cache file is not worth failing the run over
+            pass
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "wb") as f:
+            pickle.dump(
+                {
+                    "model": self.model_name,
+                    "embeddings": self._embeddings,
+                    "answers": self._answers,
+                    "last_used": self._last_used,
+                    "expires": self._expires,
+                },
+                f,
+            )
+
+    def _drop(self, indices: list[int]) -> None:
+        keep = [
+            i for i in range(len(self._answers)) if i not in set(indices)
+        ]
+        self._embeddings = self._embeddings[keep]
+        self._answers = [self._answers[i] for i in keep]
+        self._last_used = [self._last_used[i] for i in keep]
+        self._expires = [self._expires[i] for i in keep]
+
+    def get(self, embedding: list[float]) -> str | None:
+        """Return the cached answer for the closest question, if any."""
+        now = time.time()
+        expired = [i for i, t in enumerate(self._expires) if t < now]
+        if expired:
+            self._drop(expired)
+        if not self._answers:
+            return None
+
+        scores = self._embeddings @ self._normalize(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+
+        self._last_used[best] = now
+        return self._answers[best]
+
+    def put(self, embedding: list[float], answer: str) -> None:
+        """Store an answer under the question's embedding."""
+        if len(self._answers) >= self.max_entries:
+            self._drop([int(np.argmin(self._last_used))])
+
+        vector = self._normalize(embedding)[np.newaxis, :]
+        if self._embeddings.size == 0:
+            self._embeddings = vector
+        else:
+            self._embeddings = np.vstack([self._embeddings, vector])
+
+        now = time.time()
+        self._answers.append(answer)
+        self._last_used.append(now)
+        self._expires.append(now + self.ttl)
+        self._save()
@@ -1,13 +1,14 @@
-import json
+import asyncio
+import functools
+import io
 import logging
 import os
-import shutil
+import re
 
+import json5
 import nest_asyncio
-from llama_index.core import (  # StorageContext,; load_index_from_storage,
-    Settings,
-    VectorStoreIndex,
-)
+import orjson
+from llama_index.core import QueryBundle, Settings, VectorStoreIndex
 from llama_index.core.workflow import (
     Context,
     HumanResponseEvent,
@@ -17,7 +18,6 @@ from llama_index.core.workflow import (
     Workflow,
     step,
 )
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.groq import Groq
 from llama_parse import LlamaParse
 
@@ -29,13 +29,64 @@ from agentic_document_form_filler.events.parse_form_event import ParseFormEvent
 from agentic_document_form_filler.events.query_event import QueryEvent
 from agentic_document_form_filler.events.response_event import ResponseEvent
 from agentic_document_form_filler.lib.config import default_config as config
+from agentic_document_form_filler.lib.embedding_cache import (
+    CachedHuggingFaceEmbedding,
+)
+from agentic_document_form_filler.lib.query_cache import SemanticQueryCache
 
 logger = logging.getLogger(config.name)
 nest_asyncio.apply()
 
-Settings.embed_model = HuggingFaceEmbedding(
-    model_name=config.embedding_model,
-)
+# matches a markdown code fence (optionally tagged ```json) and
+# captures its body, ignoring any commentary around the fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# per-field question templates, assembled once instead of rebuilding
+# the f-strings on every loop iteration
+_QUESTION_TMPL = """How would you answer this question about the
+            candidate? <field>{field}</field>"""
+_QUESTION_TMPL_FEEDBACK = _QUESTION_TMPL + """
+                \nWe previously got feedback about how we answered the
+                questions. It might not be relevant to this particular field,
+                but here it is: <feedback>{feedback}</feedback>
+                """
+
+# feedback that plainly means "all good" — no need to ask the LLM
+_APPROVAL_RESPONSES = {
+    "",
+    "ok",
+    "okay",
+    "looks good",
+    "lgtm",
+    "yes",
+    "approved",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _embed_model() -> CachedHuggingFaceEmbedding:
+    """
+    Build the embedding model once per process and reuse it.
+    Loading is deferred until the first workflow run so importing
+    this module (e.g. in web-server worker processes that may never
+    run a workflow) doesn't pull the BGE weights into memory.
+    """
+    # give the model half the cores; the question batching already
+    # serializes embedding work, so more threads just contend
+    import torch
+
+    torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+
+    return CachedHuggingFaceEmbedding(
+        cache_path=os.path.join(config.storage_dir, "embedding_cache.db"),
+        model_name=config.embedding_model,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _groq_llm() -> Groq:
+    """Build the Groq client once per process and reuse it."""
+    return Groq(model=config.groq_model, api_key=config.groq_api_key)
 
 
 class RAGWorkflow(Workflow):
@@ -61,18 +112,27 @@ class RAGWorkflow(Workflow):
     application form.
     """
 
-    storage_dir = config.storage_dir
-    llm = Groq(model=config.groq_model, api_key=config.groq_api_key)
+    llm = _groq_llm()
     query_engine: VectorStoreIndex
+    _fields: list[str]
+    _total_fields: int
+    _responses: list[ResponseEvent]
+    query_cache = SemanticQueryCache(
+        path=os.path.join(config.storage_dir, "query_cache.pkl"),
+        model_name=config.embedding_model,
+        threshold=config.query_cache_threshold,
+    )
 
     @step
-    async def set_up(self, ev: StartEvent) -> ParseFormEvent:
+    async def set_up(self, ctx: Context, ev: StartEvent) -> ParseFormEvent:
         """
         Set up the workflow by loading the resume document and
         creating a query engine to answer questions about it.
-        The resume document is stored in the storage directory.
-        If the document is already there, load it from storage.
-        If not, parse it and store it in the storage directory.
+        The index is built in memory; only the embedding and query
+        caches live in the storage directory.
+        Parsing of the application form is kicked off here as well so
+        both LlamaParse calls run concurrently; the next step awaits
+        the result.
         The query engine is created using the Groq LLM.
         The workflow is then passed to the next step to parse the
         application form.
@@ -84,40 +144,48 @@ class RAGWorkflow(Workflow):
         if not ev.application_form:
             raise ValueError("No application form provided")
 
-        # define the LLM to work with
-        self.llm = Groq(model=config.groq_model, api_key=config.groq_api_key)
-
-        # # ingest the data and set up the query engine
-        # if os.path.exists(self.storage_dir):
-        #     # you've already ingested the resume document
-        #     storage_context = StorageContext.from_defaults(
-        #         persist_dir=self.storage_dir)
-        #     index = load_index_from_storage(storage_context)
-        # else:
-        # parse and load the resume document
-        documents = LlamaParse(
+        # first run in this process: load the embedding model
+        Settings.embed_model = _embed_model()
+
+        # parse and load the resume document; start parsing the
+        # application form at the same time since the two LlamaParse
+        # calls are independent network round-trips
+        resume_task = asyncio.create_task(
+            LlamaParse(
+                api_key=config.llama_index_api_key,
+                base_url=os.getenv("LLAMA_CLOUD_BASE_URL"),
+                result_type="markdown",
+                content_guideline_instruction="This is a resume, gather "
+                "related facts together and format it as bullet points "
+                "with headers",
+            ).aload_data(ev.resume_file)
+        )
+
+        form_parser = LlamaParse(
             api_key=config.llama_index_api_key,
             base_url=os.getenv("LLAMA_CLOUD_BASE_URL"),
             result_type="markdown",
-            content_guideline_instruction="This is a resume, gather "
-            "related facts together and format it as bullet points "
-            "with headers",
-        ).load_data(ev.resume_file)
+            content_guideline_instruction="This is a job application form. "
+            "Create a list of all the fields that need to be filled in.",
+            formatting_instruction="Return bulleted list of the fields ONLY.",
+        )
+        await ctx.set(
+            "form_parse_task",
+            asyncio.create_task(form_parser.aload_data(ev.application_form)),
+        )
+
+        documents = await resume_task
 
         # embed and index the documents
         index = VectorStoreIndex.from_documents(
             documents, embed_model=Settings.embed_model
         )
 
-        # Always create fresh index instead of using stored one
-        if os.path.exists(self.storage_dir):
-            shutil.rmtree(self.storage_dir)
-
-        index.storage_context.persist(persist_dir=self.storage_dir)
-
-        # create a query engine
+        # create a query engine; use_async lets us fire several
+        # queries concurrently later on
         self.query_engine = index.as_query_engine(llm=self.llm,
-                                                  similarity_top_k=5)
+                                                  similarity_top_k=5,
+                                                  use_async=True)
 
         # let's pass the application form to a new step to parse it
         return ParseFormEvent(application_form=ev.application_form)
@@ -129,39 +197,40 @@ class RAGWorkflow(Workflow):
     ) -> GenerateQuestionsEvent:
         """
         Parse the application form using LlamaParse and return a list of
-        fields to fill in.
+        fields to fill in. The parse itself was started in set_up; this
+        step awaits its result.
         """
-        parser = LlamaParse(
-            api_key=config.llama_index_api_key,
-            base_url=os.getenv("LLAMA_CLOUD_BASE_URL"),
-            result_type="markdown",
-            content_guideline_instruction="This is a job application form. "
-            "Create a list of all the fields that need to be filled in.",
-            formatting_instruction="Return bulleted list of the fields ONLY.",
-        )
-
         # get the LLM to convert the parsed form into JSON
-        result = parser.load_data(ev.application_form)[0]
+        form_parse_task = await ctx.get("form_parse_task")
+        result = (await form_parse_task)[0]
 
-        raw_json = self.llm.complete(
+        raw_json = await self.llm.acomplete(
             f"""This is a parsed form. Convert it into a JSON object containing
             only the list of fields to be filled in, in the form
             {{ fields: [...] }}. <form>{result.text}</form>. Return a valid
             JSON object only, no markdown code blocks or other formatting."""
         )
 
-        # Clean the response by removing markdown code block markers
+        # Clean the response by extracting the markdown code block
+        # body, if there is one
         json_str = raw_json.text.strip()
-        if json_str.startswith("```"):
-            json_str = json_str.split("\n", 1)[1]  # Remove first line
-        if json_str.endswith("```"):
-            json_str = json_str.rsplit("\n", 1)[0]  # Remove last line
-
-        json_str = json_str.strip()
-        data = json.loads(json_str)
+        match = _FENCE_RE.search(json_str)
+        if match:
+            json_str = match.group(1).strip()
+
+        try:
+            data = orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            # the LLM sometimes returns single-quoted keys or trailing
+            # commas; json5 tolerates both
+            data = json5.loads(json_str)
         fields = data["fields"]
 
-        await ctx.set("fields_to_fill", fields)
+        # plain attributes: a workflow instance serves a single run,
+        # so there's no need to round-trip these through the context
+        # store
+        self._fields = fields
+        self._total_fields = len(fields)
 
         return GenerateQuestionsEvent()
 
@@ -177,39 +246,101 @@ class RAGWorkflow(Workflow):
         """
 
         # get the list of fields to fill in
-        fields = await ctx.get("fields_to_fill")
+        fields = self._fields
+
+        # reset the response buffer for this round (the step re-fires
+        # on feedback, starting a fresh set of queries)
+        self._responses = []
+
+        # pick the template once, then generate one query for each of
+        # the fields and fire them off
+        has_feedback = hasattr(ev, "feedback")
+        if has_feedback:
+            template = _QUESTION_TMPL_FEEDBACK
+            feedback = ev.feedback
+        else:
+            template = _QUESTION_TMPL
+            feedback = ""
 
-        # generate one query for each of the fields, and fire them off
         for field in fields:
-            question = f"""How would you answer this question about the
-            candidate? <field>{field}</field>"""
-
-            if hasattr(ev, "feedback"):
-                question += f"""
-                \nWe previously got feedback about how we answered the
-                questions. It might not be relevant to this particular field,
-                but here it is: <feedback>{ev.feedback}</feedback>
-                """
+            question = template.format(field=field, feedback=feedback)
+            ctx.send_event(
+                QueryEvent(
+                    field=field, query=question, has_feedback=has_feedback
+                )
+            )
 
-            ctx.send_event(QueryEvent(field=field, query=question))
-
-        # store the number of fields so we know how many to wait for later
-        await ctx.set("total_fields", len(fields))
         return
 
     @step
-    async def ask_question(self, ev: QueryEvent) -> ResponseEvent:
+    async def ask_question(
+        self, ctx: Context, ev: QueryEvent
+    ) -> ResponseEvent:
         """
-        Ask the query engine a question about the resume document.
-        The question is about a specific field in the application form.
-        The response is a string.
+        Ask the query engine the questions about the resume document.
+        Each question is about a specific field in the application form.
+        The queries are collected first so they can all be sent to the
+        query engine concurrently; a semaphore caps the number of
+        in-flight requests to respect Groq rate limits. Questions that
+        are near-duplicates of earlier ones are answered straight from
+        the semantic query cache without touching the query engine;
+        feedback rounds skip the cache so revised answers are always
+        regenerated.
         """
-        response = self.query_engine.query(
-            f"""This is a question about the
-                                           specific resume we have in our
-                                           database: {ev.query}"""
+        events = ctx.collect_events(
+            ev, [QueryEvent] * self._total_fields
+        )
+
+        if events is None:
+            return None  # do nothing until all the queries have arrived
+
+        # embed all the questions in one batched forward pass; the
+        # vectors serve both the semantic cache lookup and retrieval
+        embeddings = Settings.embed_model.get_text_embedding_batch(
+            [event.query for event in events], show_progress=False
+        )
+        # feedback-round questions bypass the cache entirely: they
+        # differ from the previous round only in the short feedback
+        # text, so a lookup would hand back the answer the user just
+        # rejected
+        cached = [
+            None
+            if event.has_feedback
+            else self.query_cache.get(embedding)
+            for event, embedding in zip(events, embeddings)
+        ]
+
+        semaphore = asyncio.Semaphore(config.max_concurrency)
+
+        async def query_one(query: str, embedding: list[float]):
+            async with semaphore:
+                # hand the precomputed embedding to the query engine
+                # so retrieval doesn't re-embed the question
+                return await self.query_engine.aquery(
+                    QueryBundle(
+                        query_str=f"""This is a question about the
+                        specific resume we have in our
+                        database: {query}""",
+                        embedding=embedding,
+                    )
+                )
+
+        missed = [i for i, answer in enumerate(cached) if answer is None]
+        responses = await asyncio.gather(
+            *[query_one(events[i].query, embeddings[i]) for i in missed]
         )
-        return ResponseEvent(field=ev.field, response=response.response)
+
+        answers = list(cached)
+        for i, response in zip(missed, responses):
+            answers[i] = response.response
+            if not events[i].has_feedback:
+                self.query_cache.put(embeddings[i], response.response)
+
+        for event, answer in zip(events, answers):
+            ctx.send_event(
+                ResponseEvent(field=event.field, response=answer)
+            )
+        return None
 
     # Get feedback from the human
     @step
@@ -221,21 +352,22 @@ class RAGWorkflow(Workflow):
         response to the application form. Then ask the human for
         feedback on the filled form.
         """
-        # get the total number of fields to wait for
-        total_fields = await ctx.get("total_fields")
-
-        responses = ctx.collect_events(ev, [ResponseEvent] * total_fields)
+        self._responses.append(ev)
 
-        if responses is None:
+        if len(self._responses) < self._total_fields:
             return None  # do nothing if there's nothing to do yet
 
-        # we've got all the responses!
-        response_list = "\n".join(
-            "Field:" + r.field + "\n" + "Response:" + r.response
-            for r in responses
+        responses = self._responses
+
+        # we've got all the responses! write them into a single
+        # buffer rather than concatenating per-response strings
+        buf = io.StringIO()
+        buf.writelines(
+            f"Field:{r.field}\nResponse:{r.response}\n" for r in responses
         )
+        response_list = buf.getvalue()
 
-        result = self.llm.complete(
+        result = await self.llm.acomplete(
             f"""
             You are given a list of fields in an application form and
             responses to questions about those fields from a resume.
@@ -247,14 +379,16 @@ class RAGWorkflow(Workflow):
         """
         )
 
-        # save the result for later
-        await ctx.set("filled_form", str(result))
+        # save the answer text for later; stringifying the whole
+        # CompletionResponse would drag its metadata along into the
+        # final output
+        await ctx.set("filled_form", result.text)
 
         # Fire off the feedback request
         return InputRequiredEvent(
             prefix="How does this look? Give me any feedback you have on any"
             "of the answers.",
-            result=result,
+            result=result.text,
         )
 
     # Accept the feedback when a HumanResponseEvent fires
@@ -266,9 +400,15 @@ class RAGWorkflow(Workflow):
         Get feedback from the human on the filled form. If the human
         says everything is OK, stop the workflow. Otherwise, return
         the feedback to the previous step.
+        An obvious approval is recognized locally, skipping the
+        round-trip to the LLM; only ambiguous feedback is sent for
+        classification.
         """
 
-        result = self.llm.complete(
+        if ev.response.strip().lower() in _APPROVAL_RESPONSES:
+            return StopEvent(result=await ctx.get("filled_form"))
+
+        result = await self.llm.acomplete(
             f"""
             You have received some human feedback on the form-filling task
             you've done. Does everything look good, or is there more work to
@@ -284,7 +424,8 @@ class RAGWorkflow(Workflow):
 
         verdict = result.text.strip()
 
-        logger.info(f"LLM says the verdict was {verdict}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"LLM says the verdict was {verdict}")
         if verdict == "OKAY":
             return StopEvent(result=await ctx.get("filled_form"))
 
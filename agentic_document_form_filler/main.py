@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from llama_index.core.workflow import HumanResponseEvent, InputRequiredEvent
@@ -17,6 +18,8 @@ async def fill(res_path: str, form_path: str) -> str:
     Returns:
         str: The filled form.
     """
+    logging.basicConfig(level=config.log_level)
+
     workflow = RAGWorkflow(timeout=600, verbose=False)
     handler = workflow.run(
         resume_file=res_path,
@@ -27,8 +30,9 @@ async def fill(res_path: str, form_path: str) -> str:
         if isinstance(event, InputRequiredEvent):
             logger.info("We've filled in your form! Here are the results:\n")
             logger.info(event.result)
-            # now ask for input from the keyboard
-            response = input(event.prefix)
+            # now ask for input from the keyboard; run it in a thread
+            # so the blocking read doesn't stall the event loop
+            response = await asyncio.to_thread(input, event.prefix)
             handler.ctx.send_event(HumanResponseEvent(response=response))
 
     response = await handler
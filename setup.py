@@ -15,7 +15,7 @@ requires = [
     'pydantic~=2.8', 'ipykernel', 'ipython', 'python-dotenv',
     'nest-asyncio', 'llama-parse', 'llama-index',
     'llama-index-embeddings-huggingface', 'ipywidgets',
-    'llama-index-llms-groq',
+    'llama-index-llms-groq', 'json5', 'orjson', 'numpy',
 ]
 extras_requires = {
     'dev': [